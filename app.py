@@ -1,19 +1,18 @@
 # app.py
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request
 from gpio_driver import GPIOController
 from i2c_driver import (
     gp8403_set_range_0_10v,
     pressure_to_voltage,
     set_pressure,
+    set_pressures,
 )
-import threading, time
-from werkzeug.serving import WSGIRequestHandler
+import functools, gzip, heapq, itertools, logging, os, threading, time
+from types import MappingProxyType
+import orjson
+from werkzeug.exceptions import BadRequest
 from db import load_state, save_state
 
-class SilentHandler(WSGIRequestHandler):
-    def log(self, type, message, *args):
-        pass
-
 app = Flask(__name__)
 
 gpio = GPIOController(mode="BOARD")  # using physical pin numbers
@@ -28,10 +27,16 @@ PISTON_TO_DAC_CHANNEL = {
 }
 
 
+@functools.lru_cache(maxsize=512)
+def _p2v_cached(p_hundredths: int) -> float:
+    # pressure_to_voltage is pure, so results keyed on 0.01 psi never go stale
+    return float(pressure_to_voltage(p_hundredths / 100.0))
+
+
 def _pressure_to_voltage_safe(desired_pressure):
     if desired_pressure is None:
         return None
-    return float(pressure_to_voltage(float(desired_pressure)))
+    return _p2v_cached(int(round(float(desired_pressure) * 100)))
 
 
 def _apply_desired_pressure(piston: str, desired_pressure: float) -> float:
@@ -43,124 +48,198 @@ def _apply_desired_pressure(piston: str, desired_pressure: float) -> float:
     return _pressure_to_voltage_safe(value)
 
 
+_PISTON_ITEMS = tuple(PISTON_TO_DAC_CHANNEL.items())
+
+
 def _annotate_with_voltage(state: dict) -> dict:
-    for piston in PISTON_TO_DAC_CHANNEL:
-        piston_state = state.get(piston)
-        if not isinstance(piston_state, dict):
-            continue
-        pressure = piston_state.get("desired_pressure")
-        try:
-            piston_state["desired_voltage"] = _pressure_to_voltage_safe(pressure)
-        except Exception:
-            piston_state["desired_voltage"] = None
+    # load_state() always yields every piston, and the cached conversion is pure
+    for piston, _ in _PISTON_ITEMS:
+        piston_state = state[piston]
+        piston_state["desired_voltage"] = _pressure_to_voltage_safe(piston_state["desired_pressure"])
     return state
 
+class ValveScheduler:
+    """Drives the valve edges of every PistonWorker from one thread.
+
+    Pending edges live in a min-heap of (due, seq, worker, generation). A
+    worker bumps its generation whenever it is paused, reset or restarted,
+    which turns its queued edge stale without having to search the heap.
+    """
+
+    def __init__(self):
+        self.lock = threading.Condition()  # guards the heap and all worker state
+        self._heap = []
+        self._seq = itertools.count()  # tie-breaker so workers are never compared
+        self._thread = None
+
+    def schedule(self, worker: "PistonWorker", due: float):
+        # Call with self.lock held
+        worker._next_due = due
+        heapq.heappush(self._heap, (due, next(self._seq), worker, worker._generation))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="valve-scheduler", daemon=True)
+            self._thread.start()
+        self.lock.notify()
+
+    def _run(self):
+        with self.lock:
+            while True:
+                if not self._heap:
+                    self.lock.wait()
+                    continue
+                due, _, worker, generation = self._heap[0]
+                if generation != worker._generation:
+                    heapq.heappop(self._heap)
+                    continue
+                remaining = due - time.monotonic()
+                if remaining > 0:
+                    self.lock.wait(remaining)
+                    continue
+                heapq.heappop(self._heap)
+                # Edges are chained off the due time, not "now", so wake-up
+                # latency does not accumulate over many cycles
+                try:
+                    next_due = worker._on_edge(due)
+                except Exception:
+                    # One piston's failure must not take every valve down
+                    # with the shared thread
+                    app.logger.exception("Valve edge failed for %s; stopping it", worker.name)
+                    worker._stop_after_error()
+                    next_due = None
+                if next_due is not None:
+                    self.schedule(worker, next_due)
+                # Drop the lock between edges so handlers are not starved
+                # when edges are back to back (zero-length intervals)
+                self.lock.release()
+                try:
+                    time.sleep(0)
+                finally:
+                    self.lock.acquire()
+
+
+scheduler = ValveScheduler()
+
 class PistonWorker:
     def __init__(self, name: str, valve_pin: int):
         self.name = name
         self.valve_pin = valve_pin
-        self.thread = None
-        self._pause_evt = threading.Event()  # when set => PAUSED
-        self._stop_evt = threading.Event()   # when set => STOP
-        self._lock = threading.Lock()
 
+        # All fields below are guarded by scheduler.lock. The status fields
+        # are kept in one preallocated dict that status() copies.
+        self._status_view = {
+            "running": False,
+            "paused": False,
+            "current_cycle": 0,
+            "total_cycles": 0,
+        }
         self.time_on = 0.0
         self.time_off = 0.0
-        self.current_cycle = 0
-        self.total_cycles = 0
-        self.running = False
-
-    def _sleep_checking(self, seconds: float):
-        # Sleep in small slices so pause/stop is responsive
-        end = time.time() + max(0.0, seconds)
-        while time.time() < end:
-            if self._stop_evt.is_set():
-                return False
-            while self._pause_evt.is_set() and not self._stop_evt.is_set():
-                time.sleep(0.05)
-            time.sleep(0.02)
-        return not self._stop_evt.is_set()
-
-    def _run(self):
-        with self._lock:
-            self.running = True
-
+        self._last_level = None  # last level written to the valve pin
+        self._in_cycle = False   # False until the first ON edge of a run
+        self._generation = 0     # invalidates queued edges; see ValveScheduler
+        self._next_due = 0.0
+        self._paused_at = 0.0
+
+    def _set_valve(self, level: bool):
+        # Skip GPIO writes that would not change the pin
+        if level != self._last_level:
+            gpio.set(self.valve_pin, level)
+            self._last_level = level
+
+    def _on_edge(self, due: float):
+        # Runs on the scheduler thread with scheduler.lock held, so the
+        # current_cycle increment below is serialized with the resets done
+        # by start()/reset()/restore(). Returns the next edge time or None.
+        if self._last_level and self._in_cycle:
+            # ON -> OFF
+            self._set_valve(False)
+            return due + self.time_off
+
+        # OFF phase done: count the cycle, then check stop/end-of-test
+        view = self._status_view
+        if self._in_cycle:
+            view["current_cycle"] += 1
+        if 0 < view["total_cycles"] <= view["current_cycle"]:
+            view["running"] = False
+            return None
+        self._in_cycle = True
+        self._set_valve(True)
+        return due + self.time_on
+
+    def _stop_after_error(self):
+        # Scheduler thread, lock held: end the run and try to close the valve
+        self._generation += 1
+        self._status_view["running"] = False
+        self._status_view["paused"] = False
         try:
-            while not self._stop_evt.is_set():
-                # check stop/end-of-test
-                with self._lock:
-                    done = (0 < self.total_cycles <= self.current_cycle)
-                    t_on = float(self.time_on)
-                    t_off = float(self.time_off)
-                if done:
-                    break
-
-                # ON
-                gpio.set(self.valve_pin, True)
-                if not self._sleep_checking(t_on):
-                    break
-
-                # OFF
-                gpio.set(self.valve_pin, False)
-                if not self._sleep_checking(t_off):
-                    break
-
-                with self._lock:
-                    self.current_cycle += 1
-        finally:
             gpio.set(self.valve_pin, False)
-            with self._lock:
-                self.running = False
+            self._last_level = False
+        except Exception:
+            self._last_level = None  # unknown level; the next write goes through
 
     def start(self, time_on: float, time_off: float, cycles: int):
-        self._stop_evt.clear()
-        self._pause_evt.clear()
-        with self._lock:
+        with scheduler.lock:
             self.time_on = float(time_on)
             self.time_off = float(time_off)
-            self.total_cycles = int(cycles)
-            self.current_cycle = 0  # fresh run
-        if self.thread and self.thread.is_alive():
-            return  # already running (e.g., paused). resume happens elsewhere
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
+            self._status_view.update(
+                total_cycles=int(cycles),
+                current_cycle=0,  # fresh run
+                running=True,
+                paused=False,
+            )
+            self._in_cycle = False
+            self._generation += 1
+            self._set_valve(False)
+            scheduler.schedule(self, time.monotonic())
 
     def pause(self):
-        self._pause_evt.set()
+        with scheduler.lock:
+            view = self._status_view
+            if view["paused"] or not view["running"]:
+                return
+            view["paused"] = True
+            self._paused_at = time.monotonic()
+            self._generation += 1  # drop the queued edge; the valve holds its level
 
     def resume(self):
-        self._pause_evt.clear()
+        with scheduler.lock:
+            view = self._status_view
+            if not view["paused"]:
+                return
+            view["paused"] = False
+            if view["running"]:
+                # time spent paused does not count towards the current interval
+                self._generation += 1
+                scheduler.schedule(self, self._next_due + (time.monotonic() - self._paused_at))
 
     def reset(self):
-        # stop the thread and reset counters
-        self._stop_evt.set()
-        self._pause_evt.clear()
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=1.0)
-        gpio.set(self.valve_pin, False)
-        with self._lock:
-            self.current_cycle = 0
-            self.total_cycles = 0
-            self.running = False
+        # stop the run and reset counters
+        with scheduler.lock:
+            self._generation += 1
+            self._set_valve(False)
+            self._status_view.update(
+                current_cycle=0, total_cycles=0, running=False, paused=False
+            )
+
+    def restore(self, current_cycle: int, total_cycles: int):
+        # Seed the counters from persisted state at boot
+        with scheduler.lock:
+            self._status_view["current_cycle"] = int(current_cycle)
+            self._status_view["total_cycles"] = int(total_cycles)
 
     def update(self, time_on=None, time_off=None, cycles=None):
-        with self._lock:
+        # New timings take effect from the next edge
+        with scheduler.lock:
             if time_on is not None:
                 self.time_on = float(time_on)
             if time_off is not None:
                 self.time_off = float(time_off)
             if cycles is not None:
-                self.total_cycles = int(cycles)
-                # If user shrinks the target below current progress, we’ll exit on next loop
+                self._status_view["total_cycles"] = int(cycles)
+                # If user shrinks the target below current progress, we’ll exit on next edge
 
     def status(self):
-        with self._lock:
-            return {
-                "running": self.running,
-                "paused": self._pause_evt.is_set(),
-                "current_cycle": self.current_cycle,
-                "total_cycles": self.total_cycles,
-            }
+        return self._status_view.copy()
 
 # One worker per piston
 workers = {
@@ -168,42 +247,152 @@ workers = {
     "piston2": PistonWorker("piston2", PINMAP["piston2_valve"]),
 }
 
-state = load_state()
-workers["piston1"].current_cycle = int(state["piston1"]["current_cycle"])
-workers["piston1"].total_cycles = int(state["piston1"]["max_cycles"])
-workers["piston2"].current_cycle = int(state["piston2"]["current_cycle"])
-workers["piston2"].total_cycles = int(state["piston2"]["max_cycles"])
+# Authoritative in-memory state; db.save_state() writes it out in the background
+_STATE = load_state()
+_STATE_LOCK = threading.RLock()
+_BOOT_ID = os.urandom(4).hex()  # keeps ETags from a previous run from matching
+_json_cache = {}  # endpoint key -> (etag, serialized body)
+
+workers["piston1"].restore(_STATE["piston1"]["current_cycle"], _STATE["piston1"]["max_cycles"])
+workers["piston2"].restore(_STATE["piston2"]["current_cycle"], _STATE["piston2"]["max_cycles"])
 
 try:
     gp8403_set_range_0_10v()
-    for piston_name, piston_state in state.items():
-        if piston_name in PISTON_TO_DAC_CHANNEL:
-            try:
-                voltage = _apply_desired_pressure(
-                    piston_name, piston_state.get("desired_pressure", 0.0)
-                )
-            except Exception:
-                voltage = None
-            piston_state["desired_voltage"] = voltage
+    # Both setpoints change together at boot: one I2C transaction for both
+    boot_pressures = {
+        channel: float(_STATE[piston].get("desired_pressure", 0.0))
+        for piston, channel in _PISTON_ITEMS
+    }
+    set_pressures(boot_pressures[1], boot_pressures[2])
 except Exception as exc:  # pragma: no cover - hardware access
     print(f"Warning: Failed to initialize DAC: {exc}")
 
-state = _annotate_with_voltage(state)
+# desired_voltage is kept current by the pressure-setting handlers from here on
+_annotate_with_voltage(_STATE)
+
+
+def _freeze(state: dict) -> MappingProxyType:
+    return MappingProxyType({
+        key: MappingProxyType(dict(value)) if isinstance(value, dict) else value
+        for key, value in state.items()
+    })
+
+
+def _thaw(snapshot: MappingProxyType) -> dict:
+    return {
+        key: dict(value) if isinstance(value, MappingProxyType) else value
+        for key, value in snapshot.items()
+    }
+
+
+# (version, read-only copy of _STATE). Writers swap the whole tuple, so
+# readers get a consistent pair without taking _STATE_LOCK.
+_published = (0, _freeze(_STATE))
+
+
+def _mark_dirty():
+    # Callers hold _STATE_LOCK. save_state() only queues the copy; bursts of
+    # mutations are coalesced into one DB write by db's flusher thread.
+    global _published
+    _published = (_published[0] + 1, _freeze(_STATE))
+    save_state(_thaw(_published[1]))
+
+# The page is static for a deploy: render and compress it once
+with app.test_request_context("/"):
+    _INDEX_HTML = render_template("index.html", title="Pneumatics Control").encode("utf-8")
+_INDEX_GZ = gzip.compress(_INDEX_HTML, 9)
+
 @app.route("/")
 def index():
-    return render_template("index.html", title="Pneumatics Control")
+    headers = {"Cache-Control": "public, max-age=300", "Vary": "Accept-Encoding"}
+    if not request.accept_encodings.quality("gzip"):
+        return Response(_INDEX_HTML, mimetype="text/html", headers=headers)
+    headers["Content-Encoding"] = "gzip"
+    return Response(_INDEX_GZ, mimetype="text/html", headers=headers)
+
+def _json(obj, status: int = 200) -> Response:
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def _request_json() -> dict:
+    # Read the raw body once, uncached, and skip Werkzeug's JSON machinery
+    body = request.get_data(cache=False)
+    if not body:
+        raise BadRequest("Request body must be valid JSON")
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise BadRequest("Request body must be valid JSON")
+    if not isinstance(data, dict):
+        raise BadRequest("Request body must be a JSON object")
+    return data
+
+
+def _conditional_json(cache_key: str, version: str, build):
+    # Reply 304 when the client already holds this version, otherwise reuse
+    # the body serialized for it instead of re-encoding on every poll
+    etag = f"{_BOOT_ID}-{version}"
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        cached = _json_cache.get(cache_key)
+        if cached is None or cached[0] != etag:
+            cached = (etag, orjson.dumps(build(), default=dict))
+            _json_cache[cache_key] = cached
+        resp = Response(cached[1], mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 @app.route("/api/state", methods=["GET"])
 def api_state():
-    state = _annotate_with_voltage(load_state())
-    return jsonify({"ok": True, "state": state})
+    version, snapshot = _published
+    return _conditional_json(
+        "state", str(version), lambda: {"ok": True, "state": snapshot}
+    )
+
+def _desired_pressure_or_error(piston: str, desired_pressure):
+    """Validate and apply a requested pressure; returns (pressure, voltage, error)."""
+    try:
+        value = float(desired_pressure)
+    except (TypeError, ValueError):
+        return None, None, _json({"ok": False, "error": "Desired pressure must be a number"}, 400)
+    if not 0.0 <= value <= 130.0:
+        return None, None, _json({"ok": False, "error": "Desired pressure must be between 0 and 130 psi"}, 400)
+    try:
+        voltage = _apply_desired_pressure(piston, value)
+    except Exception as exc:
+        return None, None, _json({"ok": False, "error": f"Failed to set pressure: {exc}"}, 500)
+    return value, voltage, None
+
+
+def _mirror_worker_status(piston: str, ps: dict):
+    # Copy the worker's actual runtime flags into the cached state
+    st = workers[piston].status()
+    ps["running"] = bool(st["running"])
+    ps["paused"] = bool(st["paused"])
+    ps["current_cycle"] = int(st["current_cycle"])
+
+
+def _mutate_and_respond(piston: str, mutator):
+    # Apply `mutator` to the piston's cached state, schedule persistence and
+    # reply with the worker status
+    with _STATE_LOCK:
+        piston_state = _STATE[piston]
+        mutator(piston_state)
+        desired_voltage = piston_state.get("desired_voltage")
+        _mark_dirty()
+
+    status_with_voltage = workers[piston].status()
+    status_with_voltage["desired_voltage"] = desired_voltage
+    return _json({"ok": True, "status": status_with_voltage})
 
 @app.route("/api/piston/update", methods=["POST"])
 def piston_update():
-    data = request.get_json(force=True)
+    data = _request_json()
     piston = data.get("piston")
     if piston not in workers:
-        return jsonify({"ok": False, "error": "Unknown piston"}), 400
+        return _json({"ok": False, "error": "Unknown piston"}, 400)
 
     # Pull optional fields
     time_on  = data.get("time_on")
@@ -218,155 +407,113 @@ def piston_update():
     cyc   = int(cycles) if cycles is not None else None
 
     for bad in [v for v in [t_on, t_off] if v is not None and v < 0]:
-        return jsonify({"ok": False, "error": "Time values must be >= 0"}), 400
+        return _json({"ok": False, "error": "Time values must be >= 0"}, 400)
     if cyc is not None and cyc <= 0:
-        return jsonify({"ok": False, "error": "Cycles must be > 0"}), 400
+        return _json({"ok": False, "error": "Cycles must be > 0"}, 400)
+
+    if desired_pressure is not None:
+        desired_pressure, voltage, error = _desired_pressure_or_error(piston, desired_pressure)
+        if error:
+            return error
 
     # Update worker live settings
     workers[piston].update(time_on=t_on, time_off=t_off, cycles=cyc)
 
-    # Persist to DB
-    state = load_state()
-    key = piston
-    if t_on  is not None:  state[key]["time_on"]  = t_on
-    if t_off is not None:  state[key]["time_off"] = t_off
-    if cyc   is not None:
-        state[key]["max_cycles"] = cyc
-        # keep current_cycle as-is; worker will stop when hitting new target
-    if desired_pressure is not None:
-        try:
-            desired_pressure_value = float(desired_pressure)
-        except (TypeError, ValueError):
-            return jsonify({"ok": False, "error": "Desired pressure must be a number"}), 400
-        if not 0.0 <= desired_pressure_value <= 130.0:
-            return jsonify({"ok": False, "error": "Desired pressure must be between 0 and 130 psi"}), 400
-        try:
-            voltage = _apply_desired_pressure(piston, desired_pressure_value)
-        except Exception as exc:
-            return jsonify({"ok": False, "error": f"Failed to set pressure: {exc}"}), 500
-        state[key]["desired_pressure"] = desired_pressure_value
-        state[key]["desired_voltage"] = voltage
-    # also mirror runtime flags
-    st = workers[piston].status()
-    state[key]["running"] = bool(st["running"])
-    state[key]["paused"]  = bool(st["paused"])
-    state[key]["current_cycle"] = int(st["current_cycle"])
-    state = _annotate_with_voltage(state)
-    save_state(state)
+    def mutate(ps):
+        if t_on  is not None:  ps["time_on"]  = t_on
+        if t_off is not None:  ps["time_off"] = t_off
+        if cyc   is not None:
+            ps["max_cycles"] = cyc
+            # keep current_cycle as-is; worker will stop when hitting new target
+        if desired_pressure is not None:
+            ps["desired_pressure"] = desired_pressure
+            ps["desired_voltage"] = voltage
+        # also mirror runtime flags
+        _mirror_worker_status(piston, ps)
 
-    status_with_voltage = workers[piston].status()
-    status_with_voltage["desired_voltage"] = state[key].get("desired_voltage")
-    return jsonify({"ok": True, "status": status_with_voltage})
+    return _mutate_and_respond(piston, mutate)
 
 @app.route("/api/piston/start", methods=["POST"])
 def piston_start():
-    data = request.get_json(force=True)
+    data = _request_json()
     piston = data.get("piston")  # "piston1" | "piston2"
     time_on = float(data.get("time_on", 0))
     time_off = float(data.get("time_off", 0))
     cycles = int(data.get("cycles", 0))
     desired_pressure = data.get("desired_pressure")
     if piston not in workers:
-        return jsonify({"ok": False, "error": "Unknown piston"}), 400
+        return _json({"ok": False, "error": "Unknown piston"}, 400)
     if time_on < 0 or time_off < 0 or cycles <= 0:
-        return jsonify({"ok": False, "error": "Invalid parameters"}), 400
+        return _json({"ok": False, "error": "Invalid parameters"}, 400)
+    if desired_pressure is not None:
+        desired_pressure, voltage, error = _desired_pressure_or_error(piston, desired_pressure)
+        if error:
+            return error
+
     workers[piston].start(time_on, time_off, cycles)
 
-    st = load_state()
-    key = piston
-    st[key]["time_on"] = time_on
-    st[key]["time_off"] = time_off
-    st[key]["max_cycles"] = cycles
-    st[key]["current_cycle"] = 0
-    st[key]["running"] = True
-    st[key]["paused"] = False
-    if desired_pressure is not None:
-        try:
-            desired_pressure_value = float(desired_pressure)
-        except (TypeError, ValueError):
-            return jsonify({"ok": False, "error": "Desired pressure must be a number"}), 400
-        if not 0.0 <= desired_pressure_value <= 130.0:
-            return jsonify({"ok": False, "error": "Desired pressure must be between 0 and 130 psi"}), 400
-        try:
-            voltage = _apply_desired_pressure(piston, desired_pressure_value)
-        except Exception as exc:
-            return jsonify({"ok": False, "error": f"Failed to set pressure: {exc}"}), 500
-        st[key]["desired_pressure"] = desired_pressure_value
-        st[key]["desired_voltage"] = voltage
-    st = _annotate_with_voltage(st)
-    save_state(st)
+    def mutate(ps):
+        ps["time_on"] = time_on
+        ps["time_off"] = time_off
+        ps["max_cycles"] = cycles
+        ps["current_cycle"] = 0
+        ps["running"] = True
+        ps["paused"] = False
+        if desired_pressure is not None:
+            ps["desired_pressure"] = desired_pressure
+            ps["desired_voltage"] = voltage
 
-    status_with_voltage = workers[piston].status()
-    status_with_voltage["desired_voltage"] = st[key].get("desired_voltage")
-    return jsonify({"ok": True, "status": status_with_voltage})
+    return _mutate_and_respond(piston, mutate)
 
 @app.route("/api/piston/pause", methods=["POST"])
 def piston_pause():
-    data = request.get_json(force=True)
+    data = _request_json()
     piston = data.get("piston")
     if piston not in workers:
-        return jsonify({"ok": False, "error": "Unknown piston"}), 400
+        return _json({"ok": False, "error": "Unknown piston"}, 400)
     workers[piston].pause()
-
-    st = load_state()
-    st[piston]["paused"] = True
-    st[piston]["running"] = True
-    st[piston]["current_cycle"] = workers[piston].current_cycle
-    st = _annotate_with_voltage(st)
-    save_state(st)
-
-    status_with_voltage = workers[piston].status()
-    status_with_voltage["desired_voltage"] = st[piston].get("desired_voltage")
-    return jsonify({"ok": True, "status": status_with_voltage})
+    # pausing an idle worker is a no-op, so report what the worker did
+    return _mutate_and_respond(piston, lambda ps: _mirror_worker_status(piston, ps))
 
 @app.route("/api/piston/resume", methods=["POST"])
 def piston_resume():
-    data = request.get_json(force=True)
+    data = _request_json()
     piston = data.get("piston")
     if piston not in workers:
-        return jsonify({"ok": False, "error": "Unknown piston"}), 400
+        return _json({"ok": False, "error": "Unknown piston"}, 400)
     workers[piston].resume()
-
-    st = load_state()
-    st[piston]["paused"] = False
-    st[piston]["running"] = True
-    st[piston]["current_cycle"] = workers[piston].current_cycle
-    st = _annotate_with_voltage(st)
-    save_state(st)
-
-    status_with_voltage = workers[piston].status()
-    status_with_voltage["desired_voltage"] = st[piston].get("desired_voltage")
-    return jsonify({"ok": True, "status": status_with_voltage})
+    return _mutate_and_respond(piston, lambda ps: _mirror_worker_status(piston, ps))
 
 @app.route("/api/piston/reset", methods=["POST"])
 def piston_reset():
-    data = request.get_json(force=True)
+    data = _request_json()
     piston = data.get("piston")
     if piston not in workers:
-        return jsonify({"ok": False, "error": "Unknown piston"}), 400
+        return _json({"ok": False, "error": "Unknown piston"}, 400)
     workers[piston].reset()
-
-    st = load_state()
-    st[piston]["current_cycle"] = 0
-    st[piston]["running"] = False
-    st[piston]["paused"] = False
-    st = _annotate_with_voltage(st)
-    save_state(st)
-
-    status_with_voltage = workers[piston].status()
-    status_with_voltage["desired_voltage"] = st[piston].get("desired_voltage")
-    return jsonify({"ok": True, "status": status_with_voltage})
+    return _mutate_and_respond(piston, lambda ps: ps.update(
+        current_cycle=0, running=False, paused=False))
 
 @app.route("/api/piston/status", methods=["GET"])
 def piston_status():
     piston = request.args.get("piston", "piston1")
     if piston not in workers:
-        return jsonify({"ok": False, "error": "Unknown piston"}), 400
+        return _json({"ok": False, "error": "Unknown piston"}, 400)
     st = workers[piston].status()
-    state = load_state()
-    state = _annotate_with_voltage(state)
-    st["desired_voltage"] = state.get(piston, {}).get("desired_voltage")
-    return jsonify({"ok": True, "status": st})
+    state_version, snapshot = _published
+    st["desired_voltage"] = snapshot.get(piston, {}).get("desired_voltage")
+    version = (
+        f"{state_version}.{st['current_cycle']}.{st['total_cycles']}."
+        f"{int(st['running'])}{int(st['paused'])}"
+    )
+    return _conditional_json(piston, version, lambda: {"ok": True, "status": st})
+
+def _quiet_logger():
+    # waitress does not log requests; also hide its task-queue warnings
+    logging.getLogger("waitress").setLevel(logging.ERROR)
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True, request_handler=SilentHandler)
\ No newline at end of file
+    from waitress import serve
+
+    _quiet_logger()
+    serve(app, host="0.0.0.0", port=5000, threads=4, channel_request_lookahead=5)
\ No newline at end of file
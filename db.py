@@ -1,8 +1,22 @@
 # db_simple.py
-import sqlite3, json, os, threading, time
+import atexit, copy, logging, pathlib, sqlite3, json, os, threading, time
+
+LOGGER = logging.getLogger(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "pneumatics.db")
-_LOCK = threading.Lock()
+_LOCK = threading.RLock()  # serializes writers; WAL lets readers run alongside
+_CONN = None  # long-lived read-write connection, guarded by _LOCK
+_INITIALIZED = False  # schema + seed row done for this process, guarded by _LOCK
+_READERS = threading.local()  # per-thread read-only connections
+_READER_CONNS = []  # every reader ever opened, so they can be closed at exit
+_TX_DEPTH = 0  # nesting level of begin() calls, guarded by _LOCK
+
+FLUSH_DELAY_S = 0.05  # how long save_state() calls are coalesced before writing
+RETRY_DELAY_S = 1.0  # wait before retrying a failed background write
+_PENDING = None  # latest state handed to save_state(), not yet written
+_PENDING_LOCK = threading.Lock()
+_PENDING_EVT = threading.Event()
+_FLUSHER = None
 
 DEFAULT_STATE = {
     "piston1": {
@@ -27,37 +41,264 @@ DEFAULT_STATE = {
     "ui": {"piston1_on": False, "piston1_off": False, "piston2_on": False, "piston2_off": False}
 }
 
+# One typed column per DEFAULT_STATE leaf, named "<section>_<field>", so a
+# single field can be updated without (de)serializing the whole state
+_FIELDS = tuple(
+    (section, field) for section, values in DEFAULT_STATE.items() for field in values
+)
+_COLUMN_FOR = {(section, field): f"{section}_{field}" for section, field in _FIELDS}
+_COLUMNS = tuple(_COLUMN_FOR[key] for key in _FIELDS)
+# Values read back are cast to the type of their default (bools come back as 0/1)
+_CASTS = tuple(type(DEFAULT_STATE[section][field]) for section, field in _FIELDS)
+
+def _sql_type(value) -> str:
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+def _row_values(state: dict) -> list:
+    return [
+        state.get(section, {}).get(field, DEFAULT_STATE[section][field])
+        for section, field in _FIELDS
+    ]
+
+# State is recoverable counters/settings, so WAL + NORMAL sync is durable enough
+_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Constant SQL text, run on connections that live as long as the process,
+# stays in sqlite3's per-connection statement cache instead of being
+# re-prepared on every call
+_SELECT_SQL = f"SELECT {', '.join(_COLUMNS)} FROM control_state WHERE id=1"
+_UPDATE_SQL = (
+    "UPDATE control_state SET "
+    + ", ".join(f"{column}=?" for column in _COLUMNS)
+    + ", updated_at=? WHERE id=1"
+)
+_INSERT_SQL = (
+    f"INSERT OR IGNORE INTO control_state (id, {', '.join(_COLUMNS)}, updated_at) "
+    f"VALUES (1, {', '.join('?' for _ in _COLUMNS)}, ?)"
+)
+
 def _connect():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS app_state (
+    # Call with _LOCK held. The connection (and its page cache) is reused for
+    # the life of the process.
+    global _CONN
+    if _CONN is not None:
+        return _CONN
+    # Autocommit mode: every statement commits on its own, so WAL
+    # checkpointing never waits on an implicit open transaction
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    _init_once(conn)
+    _CONN = conn
+    return conn
+
+def _init_once(conn) -> None:
+    # Call with _LOCK held. The schema is fixed for the life of the process,
+    # so the DDL and seed row run once, not on every (re)connect.
+    global _INITIALIZED
+    if _INITIALIZED:
+        return
+    conn.execute("PRAGMA journal_mode=WAL")
+    columns = ",\n".join(
+        f"          {_COLUMN_FOR[key]} {_sql_type(DEFAULT_STATE[key[0]][key[1]])} NOT NULL"
+        for key in _FIELDS
+    )
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS control_state (
           id INTEGER PRIMARY KEY CHECK (id = 1),
-          blob TEXT NOT NULL,
+{columns},
           updated_at INTEGER NOT NULL
         )""")
-    # ensure row exists
-    cur = conn.execute("SELECT 1 FROM app_state WHERE id=1")
-    if not cur.fetchone():
-        conn.execute(
-            "INSERT INTO app_state (id, blob, updated_at) VALUES (1, ?, ?)",
-            (json.dumps(DEFAULT_STATE), int(time.time()))
+    # ensure row exists (no-op when it already does)
+    cur = conn.execute(_INSERT_SQL, (*_row_values(DEFAULT_STATE), int(time.time())))
+    if cur.rowcount == 1:
+        legacy = _legacy_state(conn)
+        if legacy is not None:
+            conn.execute(_UPDATE_SQL, (*_row_values(legacy), int(time.time())))
+    _INITIALIZED = True
+
+def _legacy_state(conn):
+    # State saved by versions that kept a single JSON blob in app_state, if
+    # any; it is only read once, to carry its values over
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='app_state'"
+    ).fetchone() is None:
+        return None
+    row = conn.execute("SELECT blob FROM app_state WHERE id=1").fetchone()
+    if row is None:
+        return None
+    (blob,) = row
+    return json.loads(blob)
+
+def _connect_ro():
+    # Lock-free reads: each thread gets its own read-only connection
+    conn = getattr(_READERS, "conn", None)
+    if conn is None:
+        if not _INITIALIZED:
+            # First use in this process: create the file, schema and seed
+            # row. Afterwards readers never touch _LOCK, which begin() may
+            # hold across calls.
+            with _LOCK:
+                _connect()
+        conn = sqlite3.connect(
+            pathlib.Path(DB_PATH).as_uri() + "?mode=ro",
+            uri=True, isolation_level=None, check_same_thread=False,
         )
-        conn.commit()
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        _READERS.conn = conn
+        _READER_CONNS.append(conn)
     return conn
 
+def _close() -> None:
+    global _CONN
+    with _LOCK:
+        if _CONN is not None:
+            _CONN.close()
+            _CONN = None
+        while _READER_CONNS:
+            _READER_CONNS.pop().close()
+        _READERS.__dict__.clear()
+
+atexit.register(_close)
+
 def load_state() -> dict:
+    with _PENDING_LOCK:
+        if _PENDING is not None:
+            return copy.deepcopy(_PENDING)
+    row = _connect_ro().execute(_SELECT_SQL).fetchone()
+    state = {section: {} for section in DEFAULT_STATE}
+    for (section, field), cast, value in zip(_FIELDS, _CASTS, row):
+        state[section][field] = cast(value)
+    return state
+
+def set_field(section: str, field: str, value) -> None:
+    """Write one state field immediately with a single-column UPDATE."""
+    column = _COLUMN_FOR.get((section, field))
+    if column is None:
+        raise KeyError(f"Unknown state field {section}.{field}")
     with _LOCK:
-        conn = _connect()
-        (blob,) = conn.execute("SELECT blob FROM app_state WHERE id=1").fetchone()
-        conn.close()
-        return json.loads(blob)
+        with _PENDING_LOCK:
+            # keep a queued bulk write from overwriting this value
+            if _PENDING is not None and isinstance(_PENDING.get(section), dict):
+                _PENDING[section][field] = value
+        _connect().execute(
+            f"UPDATE control_state SET {column}=?, updated_at=? WHERE id=1",
+            (value, int(time.time())),
+        )
+
+def set_cycle(piston: str, current_cycle: int) -> None:
+    set_field(piston, "current_cycle", int(current_cycle))
 
 def save_state(state: dict) -> None:
+    """Queue `state` to be written; returns without touching the disk.
+
+    Bursts of calls are collapsed by a background flusher that writes only
+    the most recent state. Do not mutate `state` after handing it over.
+    """
+    global _PENDING, _FLUSHER
+    with _PENDING_LOCK:
+        _PENDING = state
+        if _FLUSHER is None:
+            _FLUSHER = threading.Thread(target=_flusher, name="db-flusher", daemon=True)
+            _FLUSHER.start()
+    _PENDING_EVT.set()
+
+def _write_pending():
+    # Call with _LOCK held. The state stays in _PENDING until the caller has
+    # committed it (_clear_pending), so load_state() never falls through to
+    # the old row mid-write, and a failed write is simply retried later.
+    with _PENDING_LOCK:
+        state = _PENDING
+    if state is not None:
+        _connect().execute(_UPDATE_SQL, (*_row_values(state), int(time.time())))
+    return state
+
+def _clear_pending(state) -> None:
+    global _PENDING
+    with _PENDING_LOCK:
+        if state is not None and _PENDING is state:  # not superseded meanwhile
+            _PENDING = None
+
+def flush() -> None:
+    """Write the pending state, if any, right now."""
     with _LOCK:
-        conn = _connect()
-        conn.execute(
-            "UPDATE app_state SET blob=?, updated_at=? WHERE id=1",
-            (json.dumps(state), int(time.time()))
-        )
-        conn.commit()
-        conn.close()
+        state = _write_pending()
+        if _TX_DEPTH == 0:
+            _clear_pending(state)
+        # else the write is not committed yet: the outermost commit() clears it
+
+def begin() -> None:
+    """Start collecting writes into one transaction, ended by commit().
+
+    The writer lock is held until the matching commit(), so set_field()
+    calls and flushes from other threads wait instead of committing one by
+    one. Calls nest; only the outermost pair issues BEGIN/COMMIT.
+    load_state() does not see the transaction's writes until commit().
+    """
+    global _TX_DEPTH
+    _LOCK.acquire()
+    try:
+        if _TX_DEPTH == 0:
+            _connect().execute("BEGIN IMMEDIATE")
+    except BaseException:
+        _LOCK.release()
+        raise
+    _TX_DEPTH += 1
+
+def commit() -> None:
+    """End the transaction opened by begin(), including any queued save_state()."""
+    global _TX_DEPTH
+    with _LOCK:
+        if _TX_DEPTH == 0:
+            raise RuntimeError("commit() without a matching begin()")
+        try:
+            _TX_DEPTH -= 1
+            if _TX_DEPTH == 0:
+                try:
+                    state = _write_pending()
+                    _CONN.execute("COMMIT")
+                    _clear_pending(state)
+                except BaseException:
+                    if _CONN.in_transaction:
+                        _CONN.execute("ROLLBACK")
+                    raise
+        finally:
+            _LOCK.release()  # the hold taken by begin()
+
+def _flusher() -> None:
+    while True:
+        _PENDING_EVT.wait()
+        time.sleep(FLUSH_DELAY_S)
+        _PENDING_EVT.clear()
+        try:
+            flush()
+        except Exception:
+            # Keep the thread alive; the state is still pending
+            LOGGER.exception("Saving state failed; retrying in %ss", RETRY_DELAY_S)
+            time.sleep(RETRY_DELAY_S)
+            _PENDING_EVT.set()
+
+def _flush_at_exit() -> None:
+    # A begin() that never reached commit() must not take the queued state
+    # down with it: roll the open transaction back and write the state alone
+    global _TX_DEPTH
+    with _LOCK:
+        if _TX_DEPTH:
+            _TX_DEPTH = 0
+            if _CONN is not None and _CONN.in_transaction:
+                _CONN.execute("ROLLBACK")
+        flush()
+
+# Registered after _close(), so it runs first at exit
+atexit.register(_flush_at_exit)
@@ -5,11 +5,19 @@ except Exception:
     GPIO = None
     _ON_PI = False
 
+
+def _noop_output(pins, levels):
+    pass
+
+
 class GPIOController:
     def __init__(self, mode="BOARD"):
         self.mode = mode
         self._setup_done = False
         self.active = set()
+        # Chosen once here so set()/set_many() never branch on _ON_PI
+        self._output = GPIO.output if _ON_PI else _noop_output
+        self._levels = (GPIO.LOW, GPIO.HIGH) if _ON_PI else (0, 1)
 
     def _ensure_setup(self):
         if self._setup_done:
@@ -21,15 +29,27 @@ class GPIOController:
 
     def _ensure_pin(self, pin):
         self._ensure_setup()
-        if _ON_PI and pin not in self.active:
-            GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
+        if pin not in self.active:
+            if _ON_PI:
+                GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
             self.active.add(pin)
 
     def set(self, pin: int, high: bool):
-        self._ensure_pin(pin)
-        if _ON_PI:
-            GPIO.output(pin, GPIO.HIGH if high else GPIO.LOW)
+        if pin not in self.active:
+            self._ensure_pin(pin)
+        self._output(pin, self._levels[bool(high)])
+
+    def set_many(self, pairs):
+        # RPi.GPIO.output accepts parallel lists, so all pins go out in one call
+        pins, levels = [], []
+        for pin, high in pairs:
+            if pin not in self.active:
+                self._ensure_pin(pin)
+            pins.append(pin)
+            levels.append(self._levels[bool(high)])
+        if pins:
+            self._output(pins, levels)
 
     def cleanup(self):
         if _ON_PI:
-            GPIO.cleanup()
\ No newline at end of file
+            GPIO.cleanup()
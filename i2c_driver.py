@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+import os
+from array import array
 from typing import Dict, Optional
 
 try:  # pragma: no cover - hardware dependency
@@ -18,6 +19,8 @@ GP8403_CHANNEL_REGISTERS: Dict[int, int] = {
     1: 0x02,
     2: 0x04,
 }
+# Same mapping as a tuple indexed by channel, for the write path
+_REG = tuple(GP8403_CHANNEL_REGISTERS.get(ch) for ch in range(max(GP8403_CHANNEL_REGISTERS) + 1))
 
 GP8403_MIN_VOLTAGE = 0.0
 GP8403_MAX_VOLTAGE = 10.0
@@ -25,40 +28,90 @@ GP8403_MIN_PRESSURE = 0.0
 GP8403_MAX_PRESSURE = 130.534
 GP8403_MAX_CODE = 0x0FFF
 
+I2C_SLAVE = 0x0703  # ioctl request from <linux/i2c-dev.h>
+
 
-@dataclass
 class _MockSMBus:
     """Fallback SMBus implementation that only logs interactions."""
 
-    bus: int
-    closed: bool = False
+    __slots__ = ("bus", "closed")
+
+    def __init__(self, bus: int) -> None:
+        self.bus = bus
+        self.closed = False
 
-    def write_i2c_block_data(self, addr: int, register: int, values: list[int]) -> None:
-        LOGGER.debug(
-            "Mock write to I2C addr=0x%02X register=0x%02X values=%s", addr, register, values
-        )
+    def write_i2c_block_data(self, addr: int, register: int, values: bytes) -> None:
+        # A plain no-op unless debug logging is actually on
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug(
+                "Mock write to I2C addr=0x%02X register=0x%02X values=%s", addr, register, values
+            )
 
     def close(self) -> None:
         self.closed = True
         LOGGER.debug("Mock SMBus on bus %s closed", self.bus)
 
+class _RawI2C:
+    """Writes straight to /dev/i2c-N, skipping smbus2's per-call marshalling.
+
+    The bytes on the wire are the same as an SMBus I2C block write: the
+    register, then the data bytes.
+    """
+
+    __slots__ = ("bus", "fd", "addr", "_ioctl")
+
+    def __init__(self, bus: int) -> None:
+        import fcntl  # Linux only, like /dev/i2c-* itself
+
+        self.bus = bus
+        self.fd = os.open(f"/dev/i2c-{bus}", os.O_RDWR)
+        self.addr = None
+        self._ioctl = fcntl.ioctl
+
+    def write_i2c_block_data(self, addr: int, register: int, values: bytes) -> None:
+        if addr != self.addr:
+            self._ioctl(self.fd, I2C_SLAVE, addr)
+            self.addr = addr
+        os.write(self.fd, bytes((register,)) + bytes(values))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
 _bus: Optional[object] = None
 
 
+def _open_and_write(addr: int, register: int, values) -> None:
+    # First write after import/cleanup: open the bus, which rebinds
+    # _bus_write to its bound method, then forward this write to it
+    _get_bus()
+    _bus_write(addr, register, values)
+
+# Write path entry point: _bus.write_i2c_block_data once a bus is open,
+# so the hot path is a single call with no "is the bus open?" check
+_bus_write = _open_and_write
+
+
+def set_bus(bus: object) -> None:
+    """Use `bus` (anything with write_i2c_block_data/close) for all writes."""
+    global _bus, _bus_write
+    _bus = bus
+    _bus_write = bus.write_i2c_block_data
+
+
 def _get_bus() -> object:
     """Lazily obtain an SMBus or mock replacement."""
-    global _bus
-
     if _bus is None:
-        if _HardwareSMBus is not None:
+        if _HardwareSMBus is not None and os.environ.get("PNEUMATIC_FASTI2C") == "1":
+            LOGGER.debug("Opening raw i2c-dev bus %s", I2C_BUS_NUMBER)
+            set_bus(_RawI2C(I2C_BUS_NUMBER))
+        elif _HardwareSMBus is not None:
             LOGGER.debug("Opening hardware SMBus %s", I2C_BUS_NUMBER)
-            _bus_instance = _HardwareSMBus(I2C_BUS_NUMBER)
+            set_bus(_HardwareSMBus(I2C_BUS_NUMBER))
         else:
             LOGGER.warning(
                 "smbus2 is not available; using mock SMBus interface for development."
             )
-            _bus_instance = _MockSMBus(I2C_BUS_NUMBER)
-        _bus = _bus_instance
+            set_bus(_MockSMBus(I2C_BUS_NUMBER))
 
     return _bus
 
@@ -70,22 +123,32 @@ def gp8403_set_range_0_10v(address: int = GP8403_DEFAULT_ADDRESS) -> None:
         LOGGER.error("Failed to set 0–10 V range: %s", e)
         raise
 
-def _clamp(value: float, minimum: float, maximum: float) -> float:
-    return max(minimum, min(maximum, value))
+# Conversion scales, hoisted out of the per-call path
+_P_TO_V = (GP8403_MAX_VOLTAGE - GP8403_MIN_VOLTAGE) / (GP8403_MAX_PRESSURE - GP8403_MIN_PRESSURE)
+_V_SCALE = GP8403_MAX_CODE / (GP8403_MAX_VOLTAGE - GP8403_MIN_VOLTAGE)
 
 
 def pressure_to_voltage(pressure_psi: float) -> float:
-    """Map 0–100 psi → 0–10 V (values outside are clamped)."""
-    p = _clamp(pressure_psi, GP8403_MIN_PRESSURE, GP8403_MAX_PRESSURE)
-    proportion = (p - GP8403_MIN_PRESSURE) / (GP8403_MAX_PRESSURE - GP8403_MIN_PRESSURE)
-    return GP8403_MIN_VOLTAGE + proportion * (GP8403_MAX_VOLTAGE - GP8403_MIN_VOLTAGE)
+    """Map 0–130.534 psi → 0–10 V (values outside are clamped)."""
+    p = pressure_psi
+    if p < GP8403_MIN_PRESSURE:
+        p = GP8403_MIN_PRESSURE
+    elif p > GP8403_MAX_PRESSURE:
+        p = GP8403_MAX_PRESSURE
+    return GP8403_MIN_VOLTAGE + (p - GP8403_MIN_PRESSURE) * _P_TO_V
 
 def voltage_to_code(voltage: float) -> int:
     """Convert 0–10 V → 12-bit code (0x000–0xFFF)."""
-    v = _clamp(voltage, GP8403_MIN_VOLTAGE, GP8403_MAX_VOLTAGE)
-    scale = GP8403_MAX_CODE / (GP8403_MAX_VOLTAGE - GP8403_MIN_VOLTAGE)
-    code = int(round((v - GP8403_MIN_VOLTAGE) * scale))
-    return _clamp(code, 0, GP8403_MAX_CODE)  # type: ignore[arg-type]
+    v = voltage
+    if v < GP8403_MIN_VOLTAGE:
+        v = GP8403_MIN_VOLTAGE
+    elif v > GP8403_MAX_VOLTAGE:
+        v = GP8403_MAX_VOLTAGE
+    # v is clamped, so the scaled value is non-negative and int(x + 0.5)
+    # rounds it to nearest, within 0..GP8403_MAX_CODE
+    return int((v - GP8403_MIN_VOLTAGE) * _V_SCALE + 0.5)
+
+assert voltage_to_code(GP8403_MAX_VOLTAGE) == GP8403_MAX_CODE
 
 
 def _validate_channel(channel: int) -> int:
@@ -96,36 +159,86 @@ def _validate_channel(channel: int) -> int:
 
 def _write_channel_register(channel: int, code: int, address: int = GP8403_DEFAULT_ADDRESS) -> None:
     """Byte packing that matches your proven-working board order."""
-    register = GP8403_CHANNEL_REGISTERS[channel]
+    register = _REG[channel]
     low_byte  = (code >> 4) & 0xFF          # bits 11..4
     high_byte = (code << 4) & 0xF0          # bits 3..0 -> bits 7..4
-    try:
-        _get_bus().write_i2c_block_data(address, register, [high_byte, low_byte])
-    except Exception as e:
-        LOGGER.error("I2C write failed (addr=0x%02X reg=0x%02X): %s", address, register, e)
-        raise
+    # Bus errors (OSError from the driver) propagate to the caller, which reports them
+    _bus_write(address, register, bytes((high_byte, low_byte)))
+
+def _write_both_channels(code1: int, code2: int, address: int = GP8403_DEFAULT_ADDRESS) -> None:
+    """Update channels 1 and 2 in one block write.
+
+    The channel registers are adjacent and the GP8403 auto-increments the
+    register pointer, so four data bytes starting at channel 1's register
+    land in both channels within a single I2C transaction.
+    """
+    register = GP8403_CHANNEL_REGISTERS[1]
+    payload = bytes((
+        (code1 << 4) & 0xF0, (code1 >> 4) & 0xFF,
+        (code2 << 4) & 0xF0, (code2 >> 4) & 0xFF,
+    ))
+    _bus_write(address, register, payload)
 
 def set_voltage(channel: int, voltage: float, address: int = GP8403_DEFAULT_ADDRESS) -> None:
     _validate_channel(channel)
     _write_channel_register(channel, voltage_to_code(voltage), address)
 
+# Pressure -> DAC code lookup table in 0.01 psi steps (~13k entries, 26 KB).
+# That is finer than one DAC code (~0.032 psi), so the table only adds
+# rounding noise of at most one code versus the exact conversion.
+_LUT_STEPS_PER_PSI = 100
+_CODE_LUT = array(
+    "H",
+    (
+        voltage_to_code(pressure_to_voltage(i / _LUT_STEPS_PER_PSI))
+        for i in range(int(GP8403_MAX_PRESSURE * _LUT_STEPS_PER_PSI) + 1)
+    ),
+)
+
+
+def pressure_to_code(pressure_psi: float) -> int:
+    """Map a pressure straight to a 12-bit DAC code via the lookup table."""
+    p = pressure_psi
+    if p < GP8403_MIN_PRESSURE:
+        p = GP8403_MIN_PRESSURE
+    elif p > GP8403_MAX_PRESSURE:
+        p = GP8403_MAX_PRESSURE
+    return _CODE_LUT[int((p - GP8403_MIN_PRESSURE) * _LUT_STEPS_PER_PSI + 0.5)]
+
+
 def set_pressure(channel: int, pressure_psi: float, address: int = GP8403_DEFAULT_ADDRESS) -> None:
-    set_voltage(channel, pressure_to_voltage(pressure_psi), address)
+    _validate_channel(channel)
+    _write_channel_register(channel, pressure_to_code(pressure_psi), address)
+
+
+def set_voltages(voltage1: float, voltage2: float, address: int = GP8403_DEFAULT_ADDRESS) -> None:
+    """Set both channels at once (channel 1, channel 2)."""
+    _write_both_channels(voltage_to_code(voltage1), voltage_to_code(voltage2), address)
+
+
+def set_pressures(pressure1_psi: float, pressure2_psi: float, address: int = GP8403_DEFAULT_ADDRESS) -> None:
+    """Set both channels' pressures at once (channel 1, channel 2)."""
+    _write_both_channels(pressure_to_code(pressure1_psi), pressure_to_code(pressure2_psi), address)
 
 
 def cleanup() -> None:
-    global _bus
+    global _bus, _bus_write
     if _bus is not None:
         try:
             _bus.close()
         finally:
             _bus = None
+            _bus_write = _open_and_write
 
 __all__ = [
     "pressure_to_voltage",
     "voltage_to_code",
+    "pressure_to_code",
     "set_voltage",
     "set_pressure",
+    "set_voltages",
+    "set_pressures",
     "gp8403_set_range_0_10v",
+    "set_bus",
     "cleanup",
 ]
\ No newline at end of file